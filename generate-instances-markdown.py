@@ -5,7 +5,9 @@ This script generates a markdown table containing the list of Libreddit
 instances from an instances JSON file. It is assumed that the input instances
 JSON file follows the schema as instances-schema.json.
 
-This script requires python3 of at least version 3.5.
+This script requires python3 of at least version 3.6. If the orjson library
+is installed, it is used in place of the json module to parse the instances
+JSON.
 
 Almost all of this script is licensed under the GNU General Public License,
 version 3.
@@ -41,14 +43,37 @@ reproduced below.
 """
 
 import argparse
+import functools
 import json
 import os
 import sys
 
-# This script requires at least Python 3.5.
-if sys.version_info[1] < 5:
-    raise SystemError("Your python3 ({}.{}.{}) is too old. You need at least 3.5.".format(sys.version_info[0], sys.version_info[1], sys.version_info[2]))
+# orjson parses JSON considerably faster than the stdlib json module. It is
+# optional; without it the stdlib module is used.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+# This script requires at least Python 3.6.
+if sys.version_info[1] < 6:
+    raise SystemError("Your python3 ({}.{}.{}) is too old. You need at least 3.6.".format(sys.version_info[0], sys.version_info[1], sys.version_info[2]))
+
+# Header and row templates for the markdown table. The row template is
+# defined once and applied to every prepared row with str.format_map.
+_PREAMBLE = "|URL|Network|Version|Location|Behind Cloudflare?|Comment|\n|-|-|-|-|-|-|\n"
+_ROW = "|{url}|{network}|{version}|{location}|{cloudflare}|{description}|\n"
+
+# Instance keys holding an address, paired with the name of the network that
+# address is on. Order matters: the first key present in an instance wins.
+_NETS = (("url", "WWW"), ("onion", "Tor"), ("i2p", "I2P"))
+
+# Translation table mapping ASCII A-Z to the corresponding regional indicator
+# symbols (codepoint + 127397). Built once so that flag() does no per-character
+# arithmetic.
+_FLAG_TABLE = str.maketrans({chr(c): chr(c + 127397) for c in range(ord("A"), ord("Z") + 1)})
+
+@functools.lru_cache(maxsize=None)
 def flag(code: str) -> str:
     """
     Generate a regional indicator symbol from an ISO 3166-1 alpha-2 country
@@ -61,13 +86,95 @@ def flag(code: str) -> str:
     which permits modification and distribution of code.
     """
 
-    OFFSET = 127397
-
     if not code:
         return ""
 
-    points = [ord(x) + OFFSET for x in code.upper()]
-    return chr(points[0]) + chr(points[1])
+    return code.upper().translate(_FLAG_TABLE)
+
+def flags(codes: set) -> dict:
+    """
+    Bulk variant of flag(): convert a set of ISO 3166-1 alpha-2 country codes
+    in a single translation pass, returning a dict mapping each code to its
+    regional indicator symbol.
+    """
+
+    codes = list(codes)
+    joined = "".join(codes).upper().translate(_FLAG_TABLE)
+    return {code: joined[i * 2:i * 2 + 2] for i, code in enumerate(codes)}
+
+def build_rows(instances: list) -> list:
+    """
+    Transform the list of instance records into row dicts ready for the row
+    template. Instances whose network cannot be determined, or that carry no
+    version, are skipped.
+    """
+
+    # Build the location cell for every distinct country up front, with the
+    # flags converted in one bulk translation; the row loop then shares one
+    # string per country instead of assembling it per instance. Only
+    # two-letter ASCII alphabetic codes get a flag; anything else (such as
+    # the "(n/a)" placeholder) is shown as-is below. Non-ASCII letters must
+    # be rejected because upper-casing can change their length (e.g. "ß"
+    # becomes "SS"), which would misalign the two-character slicing in
+    # flags(). (The ord() checks stand in for str.isascii(), which needs
+    # Python 3.7.)
+    codes = {c for c in (i.get("country") for i in instances)
+            if isinstance(c, str) and len(c) == 2 and c.isalpha()
+            and ord(c[0]) < 128 and ord(c[1]) < 128}
+    location_by_code = {c: f"{fl} {c}" for c, fl in flags(codes).items()}
+
+    rows = []
+    for instance in instances:
+        # Fast path: the common case of a WWW instance with a version. One
+        # probe per field and no network dispatch.
+        url = instance.get("url")
+        version = instance.get("version")
+        if url and version is not None:
+            country = instance.get("country", "(n/a)")
+            rows.append({
+                "url": url,
+                "network": "WWW",
+                "version": version,
+                "location": location_by_code.get(country, country),
+                "cloudflare": "✅" if instance.get("cloudflare") else "",
+                "description": instance.get("description", ""),
+            })
+            continue
+
+        # Rare path: Tor and I2P instances, and malformed entries.
+        for key, net in _NETS:
+            address = instance.get(key)
+            if address:
+                url = address
+                network = net
+                break
+        else:
+            # Couldn't determine network, so skip instance.
+            continue
+
+        # Version is a required parameter. If this is not in the JSON, skip
+        # this instance.
+        version = instance.get("version")
+        if version is None:
+            sys.stderr.write("Skipping '{}': no version recorded".format(url))
+            continue
+
+        country = instance.get("country", "(n/a)")
+        cloudflare = bool(instance.get("cloudflare"))
+        description = instance.get("description", "")
+
+        location = location_by_code.get(country, country)
+
+        rows.append({
+            "url": url,
+            "network": network,
+            "version": version,
+            "location": location,
+            "cloudflare": "✅" if cloudflare else "",
+            "description": description,
+        })
+
+    return rows
 
 def main(args: list) -> int:
     """
@@ -90,82 +197,28 @@ WARNING: This script will overwrite the output file if it exists.
     parsed_args = parser.parse_args(args[1:])
 
     try:
-        with open(parsed_args.INPUT_FILE) as f:
-            instances = json.load(f)
+        with open(parsed_args.INPUT_FILE, "rb") as f:
+            instances = orjson.loads(f.read()) if orjson is not None else json.load(f)
     except Exception as e:
         sys.stderr.write("Error opening '{}' for reading:\n".format(parsed_args.INPUT_FILE))
         sys.stderr.write("\t" + e.__str__() + "\n")
         return 1
 
-    table_preamble = "|URL|Network|Version|Location|Behind Cloudflare?|Comment|\n|-|-|-|-|-|-|\n"
-    table_rows = []
-    for instance in instances["instances"]:
-        url = ""
-        network = ""
-        version = ""
-        country = "(n/a)"
-        cloudflare = False
-        description = ""
-
-        if "url" in instance:
-            url = instance["url"] 
-            network = "WWW"
-        elif "onion" in instance:
-            url = instance["onion"]
-            network = "Tor"
-        elif "i2p" in instance:
-            url = instance["i2p"]
-            network = "I2P"
-        else:
-            # Couldn't determine network, so skip instance.
-            continue
-
-        # Version is a required parameter. If this is not in the JSON, skip
-        # this instance.
-        if "version" not in instance:
-            sys.stderr.write("Skipping '{}': no version recorded".format(url))
-            continue
-        else:
-            version = instance["version"]
-
-        if "country" in instance:
-            country = instance["country"]
-
-        if "cloudflare" in instance and instance["cloudflare"]:
-            cloudflare = True
-
-        if "description" in instance:
-            description = instance["description"]
-
-        location = ""
-        try:
-            fl = flag(country)
-            location = fl + " " + country
-        except Exception:
-            location = country
-
-        table_rows.append("|{0}|{1}|{2}|{3}|{4}|{5}|\n".format(
-            url,
-            network,
-            version,
-            location,
-            "\u2705" if cloudflare else "",
-            description
-        ))
+    table_rows = build_rows(instances["instances"])
 
+    # Write in binary mode so the table is encoded to UTF-8 in one pass
+    # rather than row by row through a text-layer encoder.
     if parsed_args.OUTPUT_FILE == "-":
-        out = sys.stdout
+        out = sys.stdout.buffer
     else:
         try:
-            out = open(parsed_args.OUTPUT_FILE, "w" if os.path.exists(parsed_args.OUTPUT_FILE) else "x")
+            out = open(parsed_args.OUTPUT_FILE, "wb" if os.path.exists(parsed_args.OUTPUT_FILE) else "xb", buffering=1 << 20)
         except Exception as e:
             sys.stderr.write("Error opening '{}' for writing:\n".format(parsed_args.OUTPUT_FILE))
             sys.stderr.write("\t" + e.__str__() + "\n")
             return 1
 
-    out.write(table_preamble)
-    for row in table_rows:
-        out.write(row)
+    out.write((_PREAMBLE + "".join(map(_ROW.format_map, table_rows))).encode("utf-8"))
     out.close()
 
     return 0
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+"""
+This script is an interactive picker for the Libreddit instances listed in an
+instances JSON file, such as the instances.json maintained in this repository.
+It downloads the instances JSON, asks for a country and an address type (e.g.
+url, onion, i2p), and prints the addresses of the matching instances. WWW
+instances are probed in parallel and listed fastest first. It is assumed
+that the instances JSON file follows the schema as instances-schema.json.
+
+The downloaded JSON is cached on disk along with its ETag, and later runs
+send a conditional GET; when the list has not changed upstream, the cached
+copy is used without re-downloading.
+
+This script requires python3 of at least version 3.5, and the requests
+library. If the ijson library is installed, the instances JSON is parsed
+incrementally from the cache file.
+
+This script is licensed under the GNU General Public License, version 3.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import requests
+
+# ijson lets us parse the instances JSON incrementally while it downloads.
+# It is optional; without it the whole payload is buffered and parsed in one
+# go.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# orjson parses JSON considerably faster than the stdlib json module. It is
+# optional, and only used when ijson is unavailable; without either, the
+# whole-body parse falls back to the stdlib.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# This script requires at least Python 3.5.
+if sys.version_info[1] < 5:
+    raise SystemError("Your python3 ({}.{}.{}) is too old. You need at least 3.5.".format(sys.version_info[0], sys.version_info[1], sys.version_info[2]))
+
+# Location of the instances JSON maintained in this repository.
+JSON_URL = "https://raw.githubusercontent.com/libreddit/libreddit-instances/master/instances.json"
+
+# Where the downloaded instances JSON and its ETag are cached between runs.
+CACHE_DIR = os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "libreddit-instance-picker")
+
+# Instance keys that are not addresses. Whatever keys remain after removing
+# these are the address types (e.g. url, onion, i2p).
+EXCLUDE = frozenset(("country", "version", "description", "cloudflare"))
+
+# How long to wait, in seconds, for an instance to answer a reachability
+# probe.
+PROBE_TIMEOUT = 3
+
+def choose(prompt: str, options: list, allow_any: bool = False):
+    """
+    Present a numbered menu of options and prompt until the user picks one.
+
+    Returns the chosen option, or None if allow_any is True and the user
+    submitted a blank line (or closed stdin). Ctrl-C always exits.
+    """
+
+    for i, option in enumerate(options):
+        print("  {}) {}".format(i + 1, option))
+
+    while True:
+        try:
+            answer = input(prompt)
+        except KeyboardInterrupt:
+            print()
+            sys.exit(1)
+        except EOFError:
+            print()
+            if allow_any:
+                return None
+            sys.exit(1)
+
+        if allow_any and answer.strip() == "":
+            return None
+
+        try:
+            index = int(answer) - 1
+            if 0 <= index < len(options):
+                return options[index]
+        except ValueError:
+            pass
+
+        print("Please enter a number between 1 and {}.".format(len(options)))
+
+def probe(address: str):
+    """
+    HEAD an instance and return its response time in seconds, or None if it
+    could not be reached within PROBE_TIMEOUT seconds.
+    """
+
+    start = time.monotonic()
+    try:
+        requests.head(address, timeout=PROBE_TIMEOUT, allow_redirects=False)
+    except Exception:
+        return None
+    return time.monotonic() - start
+
+def fetch(session, url: str, force: bool = False):
+    """
+    Download the instances JSON into the cache, sending a conditional GET
+    when a cached copy exists. On a 304 Not Modified, no body is transferred
+    and the cached copy is reused. With force, the cached copy is ignored
+    and the JSON is downloaded unconditionally.
+
+    Returns an open binary file containing the instances JSON.
+    """
+
+    cached_json = os.path.join(CACHE_DIR, "instances.json")
+    cached_etag = os.path.join(CACHE_DIR, "etag")
+
+    headers = {}
+    if not force and os.path.exists(cached_json) and os.path.exists(cached_etag):
+        with open(cached_etag) as f:
+            etag = f.read().strip()
+        if etag:
+            headers["If-None-Match"] = etag
+
+    request = session.get(url, stream=True, headers=headers)
+    request.raise_for_status()
+
+    if request.status_code == 304:
+        return open(cached_json, "rb")
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # Download to a temporary file and move it into place before recording
+    # its ETag, so that an interrupted download can never leave a truncated
+    # body paired with a valid ETag (which would be revalidated with a 304
+    # on every later run).
+    temporary = cached_json + ".tmp"
+    with open(temporary, "wb") as f:
+        for chunk in request.iter_content(chunk_size=1 << 16):
+            f.write(chunk)
+    os.replace(temporary, cached_json)
+    with open(cached_etag, "w") as f:
+        f.write(request.headers.get("ETag", ""))
+
+    return open(cached_json, "rb")
+
+def parse(source) -> tuple:
+    """
+    Parse the instances JSON from an open binary file. Returns the update
+    date and the list of instances.
+    """
+
+    if ijson is not None:
+        # Parse incrementally, so we never hold both the raw body and the
+        # parsed result in memory at the same time.
+        updated = ""
+        instances = []
+        for key, value in ijson.kvitems(source, ""):
+            if key == "updated":
+                updated = value
+            elif key == "instances":
+                instances = value
+        return updated, instances
+
+    # Parse the JSON once; parsing it per field would re-parse the entire
+    # payload each time.
+    if orjson is not None:
+        data = orjson.loads(source.read())
+    else:
+        data = json.load(source)
+    return data["updated"], data["instances"]
+
+def main(args: list) -> int:
+    """
+    Main program function. Does everything the script is supposed to do.
+    """
+
+    # Set up options and parse arguments.
+    parser = argparse.ArgumentParser(description="""
+Interactively pick a Libreddit instance from the instances JSON. This will
+download the instances JSON, ask for a country and an address type, and print
+the addresses of the instances that match.
+""")
+    parser.add_argument("-u", "--url", dest="JSON_URL", default=JSON_URL,
+            help="location of the instances JSON")
+
+    parsed_args = parser.parse_args(args[1:])
+
+    session = requests.Session()
+    try:
+        source = fetch(session, parsed_args.JSON_URL)
+    except Exception as e:
+        sys.stderr.write("Error downloading '{}':\n".format(parsed_args.JSON_URL))
+        sys.stderr.write("\t" + e.__str__() + "\n")
+        return 1
+
+    try:
+        with source:
+            updated, instances = parse(source)
+    except Exception as e:
+        # The cached copy may be corrupt (for example, a download truncated
+        # by an old version of this script). Discard it: re-download the
+        # JSON unconditionally and try once more.
+        sys.stderr.write("Error parsing the cached instances JSON, re-downloading:\n")
+        sys.stderr.write("\t" + e.__str__() + "\n")
+        try:
+            with fetch(session, parsed_args.JSON_URL, force=True) as source:
+                updated, instances = parse(source)
+        except Exception as e:
+            sys.stderr.write("Error reading '{}':\n".format(parsed_args.JSON_URL))
+            sys.stderr.write("\t" + e.__str__() + "\n")
+            return 1
+
+    # Walk the instance list once, collecting the available countries and
+    # address types and indexing the addresses by (country, address type) so
+    # that displaying a selection is a dict lookup rather than a scan over
+    # every instance. Address types are whatever keys an instance carries
+    # besides the descriptive ones; the dict-view set difference computes
+    # that per instance in C. The None country buckets hold the addresses of
+    # every country, for when the user does not pick one.
+    countries = set()
+    address_keys = set()
+    index = collections.defaultdict(list)
+    for item in instances:
+        country = item.get("country")
+        if country is not None:
+            countries.add(country)
+        keys = item.keys() - EXCLUDE
+        address_keys |= keys
+        for key in keys:
+            # Instances without a country land straight in the None buckets;
+            # adding them under their own (None) country too would list them
+            # twice.
+            if country is not None:
+                index[(country, key)].append(item[key])
+            index[(None, key)].append(item[key])
+
+    countries = sorted(countries)
+    address_keys = sorted(address_keys)
+
+    print("\033c", end="")
+    print("Instance list updated: {}".format(updated))
+    print()
+    print("Available countries:")
+    selected_country = choose("Pick a country (blank for any): ", countries,
+            allow_any=True)
+    print()
+    print("Available address types:")
+    selected_key = choose("Pick an address type: ", address_keys)
+    print()
+
+    addresses = index.get((selected_country, selected_key), [])
+
+    if selected_key == "url" and addresses:
+        # WWW instances can be probed directly, so check them all in
+        # parallel and list the fastest first. Onion and I2P addresses need
+        # a proxy to reach and are printed unprobed.
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(32, len(addresses))) as pool:
+            latencies = list(pool.map(probe, addresses))
+
+        print("Matching instances (fastest first):")
+        for address, latency in sorted(zip(addresses, latencies),
+                key=lambda pair: (pair[1] is None, pair[1])):
+            if latency is None:
+                print("{} (unreachable)".format(address))
+            else:
+                print("{} ({:.0f} ms)".format(address, latency * 1000))
+    else:
+        print("Matching instances:")
+        for address in addresses:
+            print(address)
+
+    return 0
+
+if __name__ == "__main__":
+    rc = main(sys.argv)
+    sys.exit(rc)